@@ -0,0 +1,3 @@
+"""Enterprise database backup, restore and monitoring toolkit."""
+
+__version__ = "0.1.0"
@@ -0,0 +1,307 @@
+"""Compression helpers shared by backup and restore flows."""
+
+import bz2
+import gzip
+import logging
+import mmap
+import os
+import queue
+import shutil
+import threading
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+try:  # One-shot gzip at ~2x zlib throughput, when installed.
+    import libdeflate
+except ImportError:  # pragma: no cover
+    libdeflate = None
+
+try:  # Multi-core block gzip; output stays plain-gunzip compatible.
+    import pgzip
+except ImportError:  # pragma: no cover
+    pgzip = None
+
+try:  # Non-cryptographic hash at memcpy speed for integrity sidecars.
+    import xxhash
+except ImportError:  # pragma: no cover
+    xxhash = None
+
+try:  # Multi-threaded zstd: gzip-or-better ratios at several x speed.
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+try:  # SIMD DEFLATE for zipfile (~2-3x); archives stay standard zip.
+    from isal import isal_zlib
+except ImportError:  # pragma: no cover
+    isal_zlib = None
+
+logger = logging.getLogger(__name__)
+
+# libdeflate compresses whole buffers; above this size fall back to the
+# streaming path rather than holding source and output in memory.
+_ONESHOT_MAX = 1 << 30
+
+# Read-ahead pipeline: chunk size and queue depth bound memory at
+# depth * chunk while keeping the compressor fed.
+_PIPE_CHUNK = 4 << 20
+_PIPE_DEPTH = 4
+
+# Extension (no dot) -> method in one hash lookup; retention batches
+# call into the compression helpers once per file, so the if/elif
+# ladder adds up.
+_METHOD_BY_SUFFIX = {"gz": "gzip", "bz2": "bzip2", "zip": "zip", "zst": "zstd"}
+
+# Magic prefixes of formats that are already compressed: gzip, zip, bz2
+# and zstd. DEFLATE over these burns CPU to grow the file slightly.
+_COMPRESSED_MAGIC = (b"\x1f\x8b", b"PK\x03\x04", b"BZh", b"\x28\xb5\x2f\xfd")
+
+
+def _is_precompressed(source: Path) -> bool:
+    """True when ``source`` starts with a known compressed-format magic."""
+    try:
+        with open(source, "rb") as fh:
+            head = fh.read(4)
+    except OSError:
+        return False
+    return head.startswith(_COMPRESSED_MAGIC)
+
+
+# Serializes the scoped zipfile.zlib swap below; zipfile reads the
+# module attribute at compression time, so the patch must not leak to
+# concurrent writers in other threads.
+_zip_zlib_lock = threading.Lock()
+
+
+@contextmanager
+def _zip_deflate():
+    """Yield the effective zip level cap, using isal's zlib if present.
+
+    python-isal only implements deflate levels 0-3, so the swap is
+    scoped to this one write (and levels are clamped by the caller via
+    the yielded cap) instead of patching zipfile process-wide, where an
+    unclamped level 6 would raise from any ZipFile in the process.
+    """
+    if isal_zlib is None:
+        yield 9
+        return
+    with _zip_zlib_lock:
+        original = zipfile.zlib
+        zipfile.zlib = isal_zlib
+        try:
+            yield 3
+        finally:
+            zipfile.zlib = original
+
+
+def _piped_compress(source: Path, dest: Path, opener, level: int) -> None:
+    """Overlap source reads with compression via a bounded queue.
+
+    The synchronous loop serializes read -> compress -> write even
+    though compression is CPU-bound and reads are I/O-bound; a reader
+    thread hides roughly min(read time, compress time) of the wall
+    clock, the same shape as the restore download/decompress pipeline.
+
+    When xxhash is available the producer also folds each chunk into an
+    xxh64 digest while the data is hot in cache, and the digest lands in
+    a ``<dest>.xxh`` sidecar - an integrity record for the price of a
+    memcpy-speed update per chunk, instead of a separate full re-read
+    of the source afterwards.
+    """
+    chunks: queue.Queue = queue.Queue(maxsize=_PIPE_DEPTH)
+    errors: queue.Queue = queue.Queue()
+    digest = xxhash.xxh64() if xxhash is not None else None
+
+    def produce() -> None:
+        try:
+            with open(source, "rb") as f_in:
+                while True:
+                    chunk = f_in.read(_PIPE_CHUNK)
+                    if not chunk:
+                        break
+                    if digest is not None:
+                        digest.update(chunk)
+                    chunks.put(chunk)
+        except Exception as exc:  # noqa: BLE001 - surfaced to the caller
+            errors.put(exc)
+        finally:
+            chunks.put(b"")
+
+    producer = threading.Thread(
+        target=produce, name="compress-reader", daemon=True
+    )
+    producer.start()
+    with opener(dest, "wb", compresslevel=level) as f_out:
+        while True:
+            chunk = chunks.get()
+            if not chunk:
+                break
+            f_out.write(chunk)
+    producer.join()
+    if not errors.empty():
+        raise errors.get()
+    if digest is not None:
+        Path(str(dest) + ".xxh").write_text(digest.hexdigest() + "\n")
+
+
+def compress_file(
+    source: Path,
+    dest: Optional[Path] = None,
+    method: Optional[str] = None,
+    level: int = 6,
+) -> Path:
+    """Compress ``source`` into ``dest``, picking the method by suffix.
+
+    Gzip output goes through libdeflate in a single mmap -> compress ->
+    write pass when available: DB dumps are compression-bound, and
+    libdeflate's DEFLATE is roughly twice as fast as zlib at the same
+    ratio. Streaming stdlib codecs remain the fallback.
+    """
+    source = Path(source)
+    if dest is None:
+        dest = source.with_name(source.name + ".gz")
+    dest = Path(dest)
+    if method is None:
+        # Path.suffix re-parses the whole path through PurePath parts on
+        # every access; one rpartition on the string gets the extension.
+        method = _METHOD_BY_SUFFIX.get(str(dest).rpartition(".")[2], "gzip")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Compressing %s -> %s (%s, level %d)", source, dest, method, level
+        )
+    if method == "gzip":
+        size = source.stat().st_size
+        if libdeflate is not None and 0 < size <= _ONESHOT_MAX:
+            with open(source, "rb") as fh, mmap.mmap(
+                fh.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                compressed = libdeflate.gzip_compress(mapped, level)
+            dest.write_bytes(compressed)
+        elif pgzip is not None:
+            # Block-parallel DEFLATE: compression is compute-bound, so
+            # on an idle N-core backup host this scales near-linearly
+            # while remaining readable by stock gunzip.
+            with open(source, "rb") as f_in, pgzip.open(
+                dest,
+                "wb",
+                compresslevel=level,
+                thread=os.cpu_count(),
+                blocksize=200_000_000,
+            ) as f_out:
+                shutil.copyfileobj(f_in, f_out, length=8 << 20)
+        else:
+            _piped_compress(source, dest, gzip.open, level)
+    elif method == "bzip2":
+        _piped_compress(source, dest, bz2.open, level)
+    elif method == "zstd":
+        if zstandard is None:
+            raise ValueError(
+                "zstd compression requires the 'zstandard' package"
+            )
+        # threads=-1 sizes the internal worker pool to the CPU count;
+        # copy_stream keeps the loop in C with 1 MiB buffers.
+        compressor = zstandard.ZstdCompressor(level=level, threads=-1)
+        with open(source, "rb") as f_in, open(dest, "wb") as f_out:
+            compressor.copy_stream(
+                f_in, f_out, read_size=1 << 20, write_size=1 << 20
+            )
+    elif method == "zip":
+        # Without compresslevel zipfile uses zlib's default (-1 == 9-ish
+        # effort); strict_timestamps=False skips a localtime() range
+        # check per member. Already-compressed inputs are stored as-is:
+        # re-deflating them runs at full CPU cost for zero (often
+        # negative) gain.
+        compress_type = (
+            zipfile.ZIP_STORED
+            if _is_precompressed(source)
+            else zipfile.ZIP_DEFLATED
+        )
+        with _zip_deflate() as level_cap, zipfile.ZipFile(
+            dest,
+            "w",
+            compress_type,
+            compresslevel=min(level, level_cap),
+            strict_timestamps=False,
+        ) as zf:
+            zf.write(source, arcname=source.name)
+    else:
+        raise ValueError(f"Unsupported compression method: {method}")
+    return dest
+
+
+def get_compression_ratio(
+    original_file: Optional[Path] = None,
+    compressed_file: Optional[Path] = None,
+    *,
+    original_size: Optional[int] = None,
+    compressed_size: Optional[int] = None,
+) -> float:
+    """Size ratio original/compressed, or 0.0 when not computable.
+
+    Callers that already hold the sizes (the backup pipeline records
+    both as it goes) pass them directly and skip the stat syscalls;
+    paths remain the fallback for after-the-fact inspection.
+    """
+    if original_size is None:
+        if original_file is None:
+            return 0.0
+        original_file = Path(original_file)
+        if not original_file.exists():
+            return 0.0
+        original_size = original_file.stat().st_size
+    if compressed_size is None:
+        if compressed_file is None:
+            return 0.0
+        compressed_file = Path(compressed_file)
+        if not compressed_file.exists():
+            return 0.0
+        compressed_size = compressed_file.stat().st_size
+    if compressed_size == 0:
+        return 0.0
+    return original_size / compressed_size
+
+
+def decompress_file(src: Path, dst: Path) -> Path:
+    """Inflate ``src`` to ``dst`` through a bounded 1 MiB buffer."""
+    name = str(src)
+    if name.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError(
+                "zstd decompression requires the 'zstandard' package"
+            )
+        decompressor = zstandard.ZstdDecompressor()
+        with open(src, "rb") as f_in, open(dst, "wb") as f_out:
+            decompressor.copy_stream(
+                f_in, f_out, read_size=1 << 20, write_size=1 << 20
+            )
+        return dst
+    opener = bz2.open if name.endswith(".bz2") else gzip.open
+    with opener(src, "rb") as f_in, open(dst, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out, length=1 << 20)
+    return dst
+
+
+def decompress_file_parallel(
+    src: Path, dst: Path, threads: Optional[int] = None
+) -> Path:
+    """Inflate ``src`` using multi-core block decompression when available.
+
+    Stdlib gzip is single-threaded and tops out around 150-250 MB/s;
+    rapidgzip splits the archive into blocks and inflates them on a
+    thread pool. Falls back to :func:`decompress_file` when rapidgzip is
+    not installed or the input is not gzip.
+    """
+    if not str(src).endswith(".gz"):
+        return decompress_file(src, dst)
+    try:
+        import rapidgzip
+    except ImportError:
+        logger.debug("rapidgzip unavailable; using single-threaded gzip")
+        return decompress_file(src, dst)
+    with rapidgzip.RapidgzipFile(
+        str(src), parallelization=threads or os.cpu_count() or 1
+    ) as f_in, open(dst, "wb") as f_out:
+        shutil.copyfileobj(f_in, f_out, length=1 << 20)
+    return dst
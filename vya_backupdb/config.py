@@ -0,0 +1,24 @@
+"""Pydantic configuration models shared by backup and restore flows."""
+
+from pydantic import BaseModel
+
+
+class DatabaseConfig(BaseModel):
+    dbms_type: str = "postgresql"
+    host: str = "localhost"
+    port: int = 5432
+    username: str = "postgres"
+    password: str = ""
+    database: str = ""
+    restore_parallelism: int = 4
+
+
+class StorageConfig(BaseModel):
+    type: str = "local"
+    path: str = ""
+    bucket: str = ""
+    prefix: str = ""
+    access_key: str = ""
+    secret_key: str = ""
+    region: str = "us-east-1"
+    max_concurrency: int = 16
@@ -0,0 +1,124 @@
+"""Per-run backup context: identity, timing and result metadata."""
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from .compression import get_compression_ratio
+from .config import DatabaseConfig, StorageConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class BackupContext:
+    """State threaded through one backup run, mirroring RestoreContext.
+
+    Slots drop the per-instance __dict__: scheduled runs create one
+    context per database per cycle, and slot access is also marginally
+    faster for the pipeline's frequent attribute reads.
+    """
+
+    instance_name: str
+    database_name: str
+    dbms_type: str = "postgresql"
+    database_config: Optional[DatabaseConfig] = None
+    storage_config: Optional[StorageConfig] = None
+    backup_file: Optional[str] = None
+    compressed_file: Optional[str] = None
+    backup_size: int = 0
+    compressed_size: int = 0
+    status: str = "pending"
+    error_message: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    # Monotonic counters for duration; the wall-clock fields above stay
+    # for display only, since datetime.now() can jump under NTP slew.
+    _start_perf_ns: Optional[int] = None
+    _end_perf_ns: Optional[int] = None
+
+    def start(self) -> None:
+        self.status = "running"
+        self.start_time = datetime.now()
+        self._start_perf_ns = time.perf_counter_ns()
+        logger.debug("Backup started: %s/%s", self.instance_name, self.database_name)
+
+    def complete(
+        self,
+        backup_file: Optional[str] = None,
+        backup_size: int = 0,
+    ) -> None:
+        self.status = "success"
+        self.end_time = datetime.now()
+        self._end_perf_ns = time.perf_counter_ns()
+        if backup_file is not None:
+            self.backup_file = backup_file
+        if backup_size:
+            self.backup_size = backup_size
+
+    def fail(self, message: str) -> None:
+        self.status = "failed"
+        self.end_time = datetime.now()
+        self._end_perf_ns = time.perf_counter_ns()
+        self.error_message = message
+        logger.debug(
+            "Backup failed: %s/%s: %s",
+            self.instance_name,
+            self.database_name,
+            message,
+        )
+
+    def get_duration(self) -> Optional[timedelta]:
+        if self._start_perf_ns is not None and self._end_perf_ns is not None:
+            return timedelta(
+                microseconds=(self._end_perf_ns - self._start_perf_ns) // 1000
+            )
+        # Contexts restored from serialized state only carry wall clocks.
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def get_compression_ratio(self) -> float:
+        # The pipeline records both sizes as it runs; stat the files
+        # only when a size is missing (e.g. a rehydrated context).
+        if self.backup_size and self.compressed_size:
+            return get_compression_ratio(
+                original_size=self.backup_size,
+                compressed_size=self.compressed_size,
+            )
+        if not self.backup_file or not self.compressed_file:
+            return 0.0
+        return get_compression_ratio(self.backup_file, self.compressed_file)
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Bind each attribute once; the repeated self.X lookups (and
+        # the per-key config None checks) showed up in metrics export
+        # over large fleets.
+        duration = self.get_duration()
+        dbc = self.database_config
+        sc = self.storage_config
+        start_time = self.start_time
+        end_time = self.end_time
+        return {
+            "instance_name": self.instance_name,
+            "database_name": self.database_name,
+            "dbms_type": self.dbms_type,
+            "database_host": dbc.host if dbc else None,
+            "database_port": dbc.port if dbc else None,
+            "storage_type": sc.type if sc else None,
+            "storage_bucket": sc.bucket if sc else None,
+            "storage_prefix": sc.prefix if sc else None,
+            "backup_file": self.backup_file,
+            "compressed_file": self.compressed_file,
+            "backup_size": self.backup_size,
+            "compressed_size": self.compressed_size,
+            "status": self.status,
+            "error_message": self.error_message,
+            "start_time": start_time.isoformat() if start_time else None,
+            "end_time": end_time.isoformat() if end_time else None,
+            "duration_seconds": (
+                duration.total_seconds() if duration is not None else None
+            ),
+        }
@@ -0,0 +1,48 @@
+"""Process-wide logging setup with a non-blocking file handler."""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Optional
+
+_DEFAULT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging(
+    log_file: Path,
+    level: int = logging.INFO,
+    fmt: str = _DEFAULT_FORMAT,
+    maxsize: int = 10_000,
+) -> QueueListener:
+    """Configure the root logger to write ``log_file`` off-thread.
+
+    A FileHandler on the root logger puts disk I/O (plus a lock
+    acquisition) on every logging call in the hot backup path. Here the
+    application threads only enqueue records through a QueueHandler;
+    a single QueueListener thread formats and writes them, so a slow or
+    stalled disk never blocks a backup worker. Same shape as
+    :func:`vya_backupdb.alerts.configure_async_logging`, but for the
+    whole process. Idempotent; returns the listener, which is also
+    stopped via atexit so buffered records flush on shutdown.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+    file_handler = logging.FileHandler(
+        Path(log_file), mode="a", encoding="utf-8"
+    )
+    file_handler.setFormatter(logging.Formatter(fmt))
+    log_queue: queue.Queue = queue.Queue(maxsize=maxsize)
+    _listener = QueueListener(
+        log_queue, file_handler, respect_handler_level=True
+    )
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(QueueHandler(log_queue))
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
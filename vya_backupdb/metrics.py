@@ -0,0 +1,72 @@
+"""Operational metric records emitted by backup and restore runs."""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class _MappingMixin:
+    """Read-only mapping view over a metric's fields.
+
+    Lets rule evaluation read individual fields lazily instead of
+    materializing a throwaway to_dict() per metric per scrape.
+    """
+
+    def __getitem__(self, key: str) -> Any:
+        return getattr(self, key)
+
+    def __contains__(self, key: str) -> bool:
+        return hasattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+
+@dataclass
+class BackupMetrics(_MappingMixin):
+    """Point-in-time measurements for a single backup run."""
+
+    instance_name: str
+    database_name: str
+    duration_seconds: float = 0.0
+    backup_size_bytes: int = 0
+    compression_ratio: float = 1.0
+    success: bool = True
+    error_message: Optional[str] = None
+    timestamp: datetime = field(default_factory=datetime.now)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "instance_name": self.instance_name,
+            "database_name": self.database_name,
+            "duration_seconds": self.duration_seconds,
+            "backup_size_bytes": self.backup_size_bytes,
+            "compression_ratio": self.compression_ratio,
+            "success": self.success,
+            "error_message": self.error_message,
+            "timestamp": self.timestamp.isoformat(),
+        }
+
+
+@dataclass
+class RestoreMetrics(_MappingMixin):
+    """Point-in-time measurements for a single restore run."""
+
+    instance_name: str
+    database_name: str
+    duration_seconds: float = 0.0
+    restored_size_bytes: int = 0
+    success: bool = True
+    error_message: Optional[str] = None
+    timestamp: datetime = field(default_factory=datetime.now)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "instance_name": self.instance_name,
+            "database_name": self.database_name,
+            "duration_seconds": self.duration_seconds,
+            "restored_size_bytes": self.restored_size_bytes,
+            "success": self.success,
+            "error_message": self.error_message,
+            "timestamp": self.timestamp.isoformat(),
+        }
@@ -0,0 +1,298 @@
+"""MySQL user and grant backup."""
+
+import gzip
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+# One round-trip for all global, schema, table and column privileges;
+# grant statements are assembled client-side. The alternative SHOW
+# GRANTS loop costs one network round-trip per user.
+_BULK_GRANTS_QUERY = """
+SELECT GRANTEE, PRIVILEGE_TYPE, IS_GRANTABLE, NULL, NULL, NULL
+  FROM information_schema.USER_PRIVILEGES
+UNION ALL
+SELECT GRANTEE, PRIVILEGE_TYPE, IS_GRANTABLE, TABLE_SCHEMA, NULL, NULL
+  FROM information_schema.SCHEMA_PRIVILEGES
+UNION ALL
+SELECT GRANTEE, PRIVILEGE_TYPE, IS_GRANTABLE, TABLE_SCHEMA, TABLE_NAME, NULL
+  FROM information_schema.TABLE_PRIVILEGES
+UNION ALL
+SELECT GRANTEE, PRIVILEGE_TYPE, IS_GRANTABLE, TABLE_SCHEMA, TABLE_NAME,
+       COLUMN_NAME
+  FROM information_schema.COLUMN_PRIVILEGES
+"""
+
+
+class MySQLUserBackup:
+    """Dumps MySQL users and their grants to a restorable SQL script."""
+
+    SYSTEM_USERS: frozenset = frozenset({
+        "root",
+        "mysql.sys",
+        "mysql.session",
+        "mysql.infoschema",
+        "debian-sys-maint",
+        "phpmyadmin",
+        "pma",
+    })
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 3306,
+        username: str = "root",
+        password: str = "",
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.connection: Optional[pymysql.connections.Connection] = None
+
+    def _connection_kwargs(self) -> Dict[str, object]:
+        return {
+            "host": self.host,
+            "port": self.port,
+            "user": self.username,
+            "password": self.password,
+            "charset": "utf8mb4",
+        }
+
+    def connect(self) -> None:
+        self.connection = pymysql.connect(**self._connection_kwargs())
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self) -> "MySQLUserBackup":
+        self.connect()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def list_users(self, exclude_system: bool = True) -> List[Tuple[str, str]]:
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT User, Host FROM mysql.user ORDER BY User, Host")
+            rows = cursor.fetchall()
+        users = []
+        for username, host in rows:
+            if exclude_system and username in self.SYSTEM_USERS:
+                continue
+            users.append((username, host))
+        return users
+
+    def _fetch_grants_bulk(
+        self, users: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], List[str]]:
+        """Fetch every grant in one query and assemble statements here.
+
+        information_schema exposes GRANTEE as ``'user'@'host'``;
+        privileges are grouped per (grantee, scope) so the output
+        matches what SHOW GRANTS would emit, without the per-user
+        round-trips: O(RTT) instead of O(N * RTT).
+        """
+        wanted = set(users)
+        with self.connection.cursor() as cursor:
+            cursor.execute(_BULK_GRANTS_QUERY)
+            rows = cursor.fetchall()
+        # (user, host, scope) -> (privileges, grantable)
+        grouped: Dict[Tuple[str, str, str], List] = defaultdict(
+            lambda: [[], False]
+        )
+        # (user, host, scope) -> privilege -> [columns]
+        column_grouped: Dict[Tuple[str, str, str], Dict[str, List[str]]] = (
+            defaultdict(lambda: defaultdict(list))
+        )
+        for grantee, privilege, grantable, schema, table, column in rows:
+            # rpartition: quoted usernames may legally contain '@', the
+            # host part cannot.
+            user, _, host = grantee.rpartition("@")
+            user = user.strip("'`\"")
+            host = host.strip("'`\"")
+            if (user, host) not in wanted:
+                continue
+            if table:
+                scope = f"`{schema}`.`{table}`"
+            elif schema:
+                scope = f"`{schema}`.*"
+            else:
+                scope = "*.*"
+            entry = grouped[(user, host, scope)]
+            if privilege == "USAGE":
+                continue
+            if column:
+                column_grouped[(user, host, scope)][privilege].append(column)
+            else:
+                entry[0].append(privilege)
+            if grantable == "YES":
+                entry[1] = True
+        # Column-level grants render as PRIV (`col`, ...) alongside the
+        # table-level privileges of the same scope.
+        for key, by_privilege in column_grouped.items():
+            grouped[key][0].extend(
+                f"{privilege} ({', '.join(f'`{c}`' for c in sorted(columns))})"
+                for privilege, columns in by_privilege.items()
+            )
+        grants: Dict[Tuple[str, str], List[str]] = defaultdict(list)
+        for user, host in users:
+            # Always emit the USAGE baseline so users without explicit
+            # privileges still restore.
+            grants[(user, host)].append(
+                f"GRANT USAGE ON *.* TO '{user}'@'{host}';"
+            )
+        for (user, host, scope), (privileges, grantable) in grouped.items():
+            if not privileges:
+                continue
+            statement = (
+                f"GRANT {', '.join(sorted(privileges))} ON {scope}"
+                f" TO '{user}'@'{host}'"
+            )
+            if grantable:
+                statement += " WITH GRANT OPTION"
+            grants[(user, host)].append(statement + ";")
+        return grants
+
+    def _fetch_grants_per_user(
+        self, users: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], List[str]]:
+        """SHOW GRANTS per user: fallback when the bulk query fails."""
+        grants: Dict[Tuple[str, str], List[str]] = {}
+        # SHOW GRANTS takes identifiers, not values, so driver-side
+        # placeholders don't apply; escape the strings explicitly
+        # rather than interpolating raw mysql.user contents. One cursor
+        # serves the whole loop instead of an allocation per user.
+        escape = self.connection.escape_string
+        with self.connection.cursor() as cursor:
+            for username, host in users:
+                cursor.execute(
+                    "SHOW GRANTS FOR '%s'@'%s'" % (escape(username), escape(host))
+                )
+                grants[(username, host)] = [
+                    f"{row[0]};" for row in cursor.fetchall()
+                ]
+        return grants
+
+    # Below this many users the serial fallback finishes before the
+    # parallel path has opened its connections.
+    _PARALLEL_THRESHOLD = 16
+    _PARALLEL_WORKERS = 8
+
+    def _fetch_grants_parallel(
+        self, users: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], List[str]]:
+        """SHOW GRANTS fan-out over a small pool of connections.
+
+        The loop is latency-bound (round-trip wait, not CPU) and
+        pymysql releases the GIL on socket I/O, so ~8 threads with one
+        connection each cut wall time to roughly N/8 round-trips.
+        """
+        local = threading.local()
+        opened: List[pymysql.connections.Connection] = []
+        opened_lock = threading.Lock()
+
+        def show_grants(user_host: Tuple[str, str]) -> Tuple[Tuple[str, str], List[str]]:
+            username, host = user_host
+            conn = getattr(local, "conn", None)
+            if conn is None:
+                conn = local.conn = pymysql.connect(**self._connection_kwargs())
+                with opened_lock:
+                    opened.append(conn)
+            escape = conn.escape_string
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SHOW GRANTS FOR '%s'@'%s'" % (escape(username), escape(host))
+                )
+                return user_host, [f"{row[0]};" for row in cursor.fetchall()]
+
+        grants: Dict[Tuple[str, str], List[str]] = {}
+        try:
+            with ThreadPoolExecutor(
+                max_workers=min(self._PARALLEL_WORKERS, len(users))
+            ) as executor:
+                for user_host, statements in executor.map(show_grants, users):
+                    grants[user_host] = statements
+        finally:
+            for conn in opened:
+                conn.close()
+        return grants
+
+    def fetch_grants(
+        self, users: List[Tuple[str, str]]
+    ) -> Dict[Tuple[str, str], List[str]]:
+        try:
+            return self._fetch_grants_bulk(users)
+        except pymysql.MySQLError as exc:
+            logger.warning(
+                "Bulk grant query failed (%s); falling back to SHOW GRANTS", exc
+            )
+        if len(users) >= self._PARALLEL_THRESHOLD:
+            try:
+                return self._fetch_grants_parallel(users)
+            except pymysql.MySQLError as exc:
+                logger.warning(
+                    "Parallel SHOW GRANTS failed (%s); running serially", exc
+                )
+        return self._fetch_grants_per_user(users)
+
+    def backup_users(
+        self,
+        output_path: Path,
+        exclude_system: bool = True,
+        compress: bool = True,
+    ) -> Path:
+        """Write a SQL script recreating users' grants.
+
+        Lines stream straight into the (optionally gzipped) file via a
+        generator, so the script is never materialized in memory.
+        compresslevel=1 is deliberate: SQL text compresses almost as
+        well at level 1 as at the default 9 while costing a fraction
+        of the CPU.
+        """
+        output_path = Path(output_path)
+        users = self.list_users(exclude_system=exclude_system)
+        grants = self.fetch_grants(users)
+
+        def lines():
+            yield f"-- MySQL grants backup {datetime.now().isoformat()}\n"
+            yield f"-- Host: {self.host}:{self.port}\n"
+            yield "\n"
+            for user, host in users:
+                yield f"-- Grants for '{user}'@'{host}'\n"
+                for statement in grants.get((user, host), []):
+                    yield f"{statement}\n"
+                yield "\n"
+
+        if compress:
+            fh = gzip.open(output_path, "wt", encoding="utf-8", compresslevel=1)
+        else:
+            fh = open(output_path, "w", encoding="utf-8")
+        with fh:
+            fh.writelines(lines())
+        logger.info("Backed up grants for %d users to %s", len(users), output_path)
+        return output_path
+
+    @staticmethod
+    def get_user_privileges(grant_statements: List[str]) -> List[str]:
+        """Extract the privilege lists from SHOW GRANTS style statements."""
+        privileges = []
+        for grant_stmt in grant_statements:
+            # SHOW GRANTS statements always open with "GRANT ": one
+            # prefix memcmp plus one C-level find, no substring scans
+            # or intermediate split lists.
+            if grant_stmt.startswith("GRANT "):
+                on_idx = grant_stmt.find(" ON ", 6)
+                if on_idx > 0:
+                    privileges.append(grant_stmt[6:on_idx].strip())
+        return privileges
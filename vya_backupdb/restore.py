@@ -0,0 +1,606 @@
+"""Restore orchestration: context, strategies and the retrying executor."""
+
+import bz2
+import gzip
+import logging
+import os
+import queue
+import shutil
+import random
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import mkdtemp
+from typing import Any, Dict, Optional, Type
+
+try:  # Optional: only needed to restore .zst backups.
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+from .alerts import AlertSeverity, AlertTrigger, NotificationType
+from .compression import decompress_file, decompress_file_parallel
+from .config import DatabaseConfig, StorageConfig
+from .database import PostgreSQLAdapter
+from .metrics import RestoreMetrics
+from .storage import LocalStorage, StorageAdapter, get_storage_adapter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True, kw_only=True)
+class RestoreContext:
+    """Mutable state for one restore run, threaded through the pipeline.
+
+    Slotted: schedulers keep thousands of completed contexts around for
+    history/metrics, and slots cut per-instance memory roughly in half.
+    """
+
+    # Suffix -> compression method, resolved once per context instead of
+    # re-walking endswith chains on every needs_decompression call.
+    _COMPRESSION_TYPES = {".gz": "gzip", ".bz2": "bzip2", ".zst": "zstd"}
+
+    instance_name: str
+    database_name: str
+    backup_file: str
+    database_config: DatabaseConfig
+    storage_config: StorageConfig
+    target_database: Optional[str] = None
+    status: str = "pending"
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    error_message: Optional[str] = None
+    downloaded_file: Optional[Path] = None
+    decompressed_file: Optional[Path] = None
+    temp_dir: Optional[Path] = None
+    download_size: int = 0
+    backup_file_size: Optional[int] = None
+    # Monotonic clock pair for duration; wall-clock start/end_time are
+    # kept only for to_dict() serialization.
+    _start_monotonic: Optional[float] = None
+    _end_monotonic: Optional[float] = None
+    _compression_type: Optional[str] = field(init=False, repr=False, default=None)
+
+    def set_download_size(self, size: int) -> None:
+        self.download_size = size
+
+    def start(self) -> None:
+        self.status = "running"
+        self.start_time = datetime.now()
+        self._start_monotonic = time.monotonic()
+
+    def complete(self) -> None:
+        self.status = "completed"
+        self.end_time = datetime.now()
+        self._end_monotonic = time.monotonic()
+
+    def fail(self, message: str) -> None:
+        self.status = "failed"
+        self.end_time = datetime.now()
+        self._end_monotonic = time.monotonic()
+        self.error_message = message
+
+    def get_duration(self) -> Optional[timedelta]:
+        if self.start_time is None or self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def get_duration_seconds(self) -> float:
+        """Monotonic duration -- immune to wall-clock jumps, no datetime math."""
+        if self._start_monotonic is None or self._end_monotonic is None:
+            return 0.0
+        return self._end_monotonic - self._start_monotonic
+
+    def set_downloaded_file(self, path: Path) -> None:
+        self.downloaded_file = path
+
+    def set_decompressed_file(self, path: Path) -> None:
+        self.decompressed_file = path
+
+    def __post_init__(self) -> None:
+        ext = "." + self.backup_file.rsplit(".", 1)[-1].lower()
+        self._compression_type = self._COMPRESSION_TYPES.get(ext)
+
+    def get_compression_type(self) -> Optional[str]:
+        return self._compression_type
+
+    def needs_decompression(self) -> bool:
+        return self._compression_type is not None
+
+    def to_dict(self) -> Dict[str, Any]:
+        # exclude= keeps secrets out of the dump without allocating and
+        # then discarding their entries, and new sensitive fields can't
+        # leak through a forgotten pop().
+        database = self.database_config.model_dump(exclude={"password"})
+        storage = self.storage_config.model_dump(
+            exclude={"access_key", "secret_key"}
+        )
+        return {
+            "instance_name": self.instance_name,
+            "database_name": self.database_name,
+            "backup_file": self.backup_file,
+            "target_database": self.target_database,
+            "status": self.status,
+            "start_time": self.start_time.isoformat() if self.start_time else None,
+            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "error_message": self.error_message,
+            "database_config": database,
+            "storage_config": storage,
+        }
+
+
+class _QueueStream:
+    """File-like reader draining a queue of byte chunks (None = EOF)."""
+
+    def __init__(self, chunks: "queue.Queue[Optional[bytes]]") -> None:
+        self._chunks = chunks
+        self._buffer = b""
+        self._eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._eof = True
+                break
+            self._buffer += chunk
+        if size < 0:
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+class RestoreStrategy(ABC):
+    """Interface implemented by concrete restore flavors."""
+
+    name: str = ""
+
+    @abstractmethod
+    def execute(self, context: RestoreContext, **kwargs: Any) -> bool:
+        """Run the restore; returns True on success."""
+
+
+class FullRestoreStrategy(RestoreStrategy):
+    """Restores a complete dump into the target database.
+
+    The default path streams storage -> decompressor -> psql stdin so
+    bytes move through RAM once and nothing is staged on disk twice. The
+    temp-file path is retained behind ``streaming=False`` for debugging.
+    """
+
+    name = "full"
+
+    # Above this size, single-threaded gzip dominates restore wall time;
+    # prefer parallel block decompression when rapidgzip is installed.
+    _PARALLEL_DECOMPRESS_THRESHOLD = 256 << 20
+
+    def execute(
+        self,
+        context: RestoreContext,
+        streaming: bool = True,
+        storage_adapter: Optional[StorageAdapter] = None,
+        db_adapter: Optional[PostgreSQLAdapter] = None,
+    ) -> bool:
+        if storage_adapter is None:
+            storage_adapter = get_storage_adapter(context.storage_config)
+        if db_adapter is None:
+            db_adapter = PostgreSQLAdapter.from_config(context.database_config)
+        target_db = context.target_database or context.database_name
+        if streaming:
+            return self._execute_streaming(
+                context, storage_adapter, db_adapter, target_db
+            )
+        return self._execute_via_tempfiles(
+            context, storage_adapter, db_adapter, target_db
+        )
+
+    # Bounded hand-off queues: RAM is capped at maxsize * chunk size per
+    # stage while download, decompression and DB ingest run in parallel.
+    _PIPELINE_CHUNK = 1 << 20
+    _PIPELINE_DEPTH = 4
+
+    def _execute_streaming(
+        self,
+        context: RestoreContext,
+        storage_adapter: StorageAdapter,
+        db_adapter: PostgreSQLAdapter,
+        target_db: str,
+    ) -> bool:
+        compression = context.get_compression_type()
+        if compression is None:
+            raw = storage_adapter.open_stream(context.backup_file)
+            try:
+                return db_adapter.restore_database_from_stream(target_db, raw)
+            finally:
+                raw.close()
+        return self._execute_pipelined(
+            context, storage_adapter, db_adapter, target_db, compression
+        )
+
+    def _execute_pipelined(
+        self,
+        context: RestoreContext,
+        storage_adapter: StorageAdapter,
+        db_adapter: PostgreSQLAdapter,
+        target_db: str,
+        compression: str,
+    ) -> bool:
+        """Download, decompress and ingest as three overlapped stages."""
+        q_raw: "queue.Queue[Optional[bytes]]" = queue.Queue(self._PIPELINE_DEPTH)
+        q_plain: "queue.Queue[Optional[bytes]]" = queue.Queue(self._PIPELINE_DEPTH)
+        errors: "queue.Queue[BaseException]" = queue.Queue()
+        stop = threading.Event()
+
+        def _put(q: queue.Queue, item: Optional[bytes]) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def stage_download() -> None:
+            total = 0
+            try:
+                raw = storage_adapter.open_stream(context.backup_file)
+                try:
+                    while True:
+                        chunk = raw.read(self._PIPELINE_CHUNK)
+                        if not chunk:
+                            break
+                        total += len(chunk)
+                        if not _put(q_raw, chunk):
+                            return
+                finally:
+                    raw.close()
+            except Exception as exc:
+                errors.put(exc)
+            finally:
+                context.set_download_size(total)
+                _put(q_raw, None)
+
+        def _new_decompressor() -> Any:
+            if compression == "gzip":
+                return zlib.decompressobj(wbits=31)
+            if compression == "bzip2":
+                return bz2.BZ2Decompressor()
+            if zstandard is None:
+                raise ValueError(
+                    "zstd decompression requires the 'zstandard' package"
+                )
+            return zstandard.ZstdDecompressor().decompressobj()
+
+        def stage_decompress() -> None:
+            try:
+                decomp: Any = _new_decompressor()
+                while True:
+                    chunk = q_raw.get()
+                    if chunk is None:
+                        break
+                    while chunk:
+                        data = decomp.decompress(chunk)
+                        if data and not _put(q_plain, data):
+                            return
+                        # Multi-member archives (pgzip output, block
+                        # bzip2, concatenated .gz) continue past the
+                        # first member; restart the decompressor on the
+                        # leftover bytes like the gzip module does, or
+                        # everything after member one is silently lost.
+                        # getattr: zstd decompression objects may lack
+                        # eof/unused_data on older zstandard releases.
+                        if getattr(decomp, "eof", False) and getattr(
+                            decomp, "unused_data", b""
+                        ):
+                            chunk = decomp.unused_data
+                            decomp = _new_decompressor()
+                        else:
+                            chunk = b""
+                if hasattr(decomp, "flush"):
+                    tail = decomp.flush()
+                    if tail:
+                        _put(q_plain, tail)
+            except Exception as exc:
+                errors.put(exc)
+            finally:
+                _put(q_plain, None)
+
+        threads = [
+            threading.Thread(target=stage_download, daemon=True),
+            threading.Thread(target=stage_decompress, daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            ok = db_adapter.restore_database_from_stream(
+                target_db, _QueueStream(q_plain)
+            )
+        finally:
+            stop.set()
+        for thread in threads:
+            thread.join(timeout=5.0)
+        if not errors.empty():
+            raise errors.get()
+        return ok
+
+    def _execute_via_tempfiles(
+        self,
+        context: RestoreContext,
+        storage_adapter: StorageAdapter,
+        db_adapter: PostgreSQLAdapter,
+        target_db: str,
+    ) -> bool:
+        temp_dir = Path(mkdtemp(prefix="vya_restore_"))
+        context.temp_dir = temp_dir
+        if isinstance(storage_adapter, LocalStorage):
+            # The DB only needs read access; restoring straight from the
+            # stored file skips a full-file copy and halves temp disk use.
+            # downloaded_file stays unset so cleanup never unlinks the
+            # source backup.
+            download_path = storage_adapter.resolve(context.backup_file)
+        else:
+            download_path = temp_dir / Path(context.backup_file).name
+            storage_adapter.download(context.backup_file, download_path)
+            context.set_downloaded_file(download_path)
+        restore_path = download_path
+        if context.needs_decompression():
+            compression = context.get_compression_type()
+            if compression == "gzip":
+                opener = gzip.open
+            elif compression == "bzip2":
+                opener = bz2.open
+            else:
+                if zstandard is None:
+                    raise ValueError(
+                        "zstd decompression requires the 'zstandard' package"
+                    )
+                opener = zstandard.open
+            # The fifo feeder inflates single-threaded; past the
+            # threshold that one core becomes the restore's bottleneck,
+            # and multi-core block decompression to a staged file
+            # outruns the streaming pipe despite the extra disk pass.
+            use_parallel = (
+                compression == "gzip"
+                and download_path.stat().st_size
+                > self._PARALLEL_DECOMPRESS_THRESHOLD
+            )
+            if not use_parallel and hasattr(os, "mkfifo"):
+                # Decompress into a named pipe so the DB starts ingesting
+                # as soon as the first chunk is ready, instead of waiting
+                # for the whole archive to be inflated to disk first.
+                fifo_path = temp_dir / "restore.fifo"
+                os.mkfifo(fifo_path)
+                errors: queue.Queue = queue.Queue()
+
+                def _feed() -> None:
+                    try:
+                        with opener(download_path, "rb") as src, open(
+                            fifo_path, "wb"
+                        ) as dst:
+                            shutil.copyfileobj(src, dst, length=1 << 20)
+                    except Exception as exc:  # propagated after join
+                        errors.put(exc)
+
+                feeder = threading.Thread(target=_feed, daemon=True)
+                feeder.start()
+                ok = db_adapter.restore_database(target_db, str(fifo_path))
+                feeder.join(timeout=5.0)
+                if feeder.is_alive():
+                    # psql exited without ever opening the fifo (DB
+                    # unreachable, bad auth, missing binary): the feeder
+                    # is parked in open(..., "wb"), which blocks until a
+                    # reader appears. Open a transient read end to
+                    # release it; the feeder's next write then fails
+                    # with BrokenPipeError, which we discard in favor of
+                    # the restore's own result.
+                    try:
+                        rfd = os.open(
+                            str(fifo_path), os.O_RDONLY | os.O_NONBLOCK
+                        )
+                        os.close(rfd)
+                    except OSError:
+                        pass
+                    feeder.join(timeout=5.0)
+                    if feeder.is_alive():
+                        raise RuntimeError(
+                            f"restore feeder stuck writing {fifo_path}"
+                        )
+                    while not errors.empty():
+                        logger.debug(
+                            "Feeder unblocked after failed restore: %s",
+                            errors.get(),
+                        )
+                    return ok
+                if not errors.empty():
+                    raise errors.get()
+                return ok
+            # Decompressed output always lands in temp_dir -- never next
+            # to the (possibly source-of-truth) downloaded file.
+            restore_path = temp_dir / download_path.with_suffix("").name
+            if use_parallel:
+                decompress_file_parallel(download_path, restore_path)
+            else:
+                decompress_file(download_path, restore_path)
+            context.set_decompressed_file(restore_path)
+        return db_adapter.restore_database(target_db, str(restore_path))
+
+
+class RestoreStrategyFactory:
+    """Creates restore strategies by name."""
+
+    _strategies: Dict[str, Type[RestoreStrategy]] = {
+        "full": FullRestoreStrategy,
+    }
+    # Strategies are stateless; hand out one shared instance per name so
+    # repeated create() calls (e.g. retry loops) allocate nothing and any
+    # future per-strategy setup cost is amortized.
+    _instances: Dict[str, RestoreStrategy] = {}
+
+    @classmethod
+    def register(cls, name: str, strategy_cls: Type[RestoreStrategy]) -> None:
+        name_lower = name.lower()
+        cls._strategies[name_lower] = strategy_cls
+        cls._instances.pop(name_lower, None)
+
+    @classmethod
+    def create(cls, name: str) -> RestoreStrategy:
+        name_lower = name.lower()
+        instance = cls._instances.get(name_lower)
+        if instance is None:
+            if name_lower not in cls._strategies:
+                raise ValueError(f"Unknown restore strategy: {name}")
+            instance = cls._strategies[name_lower]()
+            cls._instances[name_lower] = instance
+        return instance
+
+
+class RestoreExecutor:
+    """Runs a restore with retries, then records metrics and notifies."""
+
+    def __init__(
+        self,
+        strategy_name: str = "full",
+        max_retries: int = 3,
+        retry_delay: float = 5.0,
+        retry_backoff_factor: float = 2.0,
+        retry_max_delay: float = 60.0,
+        retriable_exceptions: tuple = (ConnectionError, TimeoutError, OSError),
+        metrics_collector: Optional[Any] = None,
+        alert_manager: Optional[Any] = None,
+        notification_manager: Optional[Any] = None,
+    ) -> None:
+        self.strategy_name = strategy_name
+        self.strategy = RestoreStrategyFactory.create(strategy_name)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.retry_backoff_factor = retry_backoff_factor
+        self.retry_max_delay = retry_max_delay
+        self.retriable_exceptions = retriable_exceptions
+        self.metrics_collector = metrics_collector
+        self.alert_manager = alert_manager
+        self.notification_manager = notification_manager
+
+    def execute(self, context: RestoreContext) -> bool:
+        context.start()
+        # Build and warm the adapters once: S3 signing, TLS handshakes
+        # and DB auth happen cold only here, not on every retry attempt.
+        storage_adapter = get_storage_adapter(context.storage_config)
+        storage_adapter.warm_up()
+        db_adapter = PostgreSQLAdapter.from_config(context.database_config)
+        db_adapter.ping()
+        success = False
+        for attempt in range(1, self.max_retries + 1):
+            if attempt > 1:
+                # Exponential backoff with jitter: gives a recovering
+                # DB/storage backend room instead of hammering it, and
+                # de-synchronizes concurrent retry loops.
+                delay = min(
+                    self.retry_max_delay,
+                    self.retry_delay
+                    * (self.retry_backoff_factor ** (attempt - 2))
+                    + random.random() * self.retry_delay,
+                )
+                time.sleep(delay)
+            try:
+                if self.strategy.execute(
+                    context,
+                    storage_adapter=storage_adapter,
+                    db_adapter=db_adapter,
+                ):
+                    context.complete()
+                    success = True
+                    break
+                logger.warning(
+                    "Restore attempt %d/%d failed for %s",
+                    attempt, self.max_retries, context.database_name,
+                )
+            except Exception as exc:
+                logger.exception(
+                    "Restore attempt %d/%d raised for %s",
+                    attempt, self.max_retries, context.database_name,
+                )
+                context.error_message = str(exc)
+                if not isinstance(exc, self.retriable_exceptions):
+                    # Auth/config errors will not succeed on retry.
+                    break
+        if not success:
+            context.fail(context.error_message or "restore failed")
+        # Stat once; metrics, alerts and notifications all reuse this.
+        if context.backup_file_size is None:
+            if context.download_size:
+                context.backup_file_size = context.download_size
+            else:
+                path = context.downloaded_file or Path(context.backup_file)
+                context.backup_file_size = (
+                    path.stat().st_size if path.exists() else 0
+                )
+        self._cleanup_temp_files(context)
+        # Build the metrics record once, and only when a consumer is
+        # actually wired up -- no serialization work on bare executors.
+        if self.metrics_collector is not None or self.alert_manager is not None:
+            metrics = self._build_metrics(context)
+            if self.metrics_collector is not None:
+                self.metrics_collector.record(metrics)
+            if self.alert_manager is not None:
+                self.alert_manager.evaluate_metrics([metrics])
+        if self.notification_manager is not None:
+            self._send_notification(context)
+        return success
+
+    def _cleanup_temp_files(self, context: RestoreContext) -> None:
+        if context.temp_dir is not None:
+            # Everything intermediate lives under one mkdtemp; a single
+            # rmtree replaces per-file unlinks and also catches any
+            # future intermediates (fifos, partial decompressions).
+            shutil.rmtree(context.temp_dir, ignore_errors=True)
+            return
+        if context.downloaded_file is not None:
+            try:
+                context.downloaded_file.unlink()
+                logger.debug("Removed %s", context.downloaded_file)
+            except OSError:
+                logger.warning("Could not remove %s", context.downloaded_file)
+        if context.decompressed_file is not None:
+            try:
+                context.decompressed_file.unlink()
+                logger.debug("Removed %s", context.decompressed_file)
+            except OSError:
+                logger.warning("Could not remove %s", context.decompressed_file)
+
+    def _backup_file_size(self, context: RestoreContext) -> int:
+        return context.backup_file_size or 0
+
+    def _build_metrics(self, context: RestoreContext) -> RestoreMetrics:
+        return RestoreMetrics(
+            instance_name=context.instance_name,
+            database_name=context.database_name,
+            duration_seconds=context.get_duration_seconds(),
+            restored_size_bytes=self._backup_file_size(context),
+            success=context.status == "completed",
+            error_message=context.error_message,
+        )
+
+    def _send_notification(self, context: RestoreContext) -> None:
+        succeeded = context.status == "completed"
+        trigger = AlertTrigger(
+            rule_name="restore",
+            severity=AlertSeverity.INFO if succeeded else AlertSeverity.CRITICAL,
+            message=(
+                f"Restore of {context.database_name} "
+                f"{'completed' if succeeded else 'failed'} in "
+                f"{context.get_duration_seconds():.1f}s"
+            ),
+            metric_name="restore",
+            value=self._backup_file_size(context),
+            timestamp=datetime.now(),
+            metadata=context.to_dict(),
+        )
+        self.notification_manager.send_notification(
+            trigger,
+            NotificationType.SUCCESS if succeeded else NotificationType.FAILURE,
+        )
@@ -0,0 +1,628 @@
+"""Cron-based backup scheduling: configs, execution records and the manager."""
+
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from croniter import croniter
+
+logger = logging.getLogger(__name__)
+
+try:  # C-accelerated JSON for schedule persistence; stdlib fallback.
+    import orjson
+
+    _loads = orjson.loads
+
+    def _dump_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+except ImportError:  # pragma: no cover
+    _loads = json.loads
+
+    def _dump_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+
+
+# Lazily resolved cron_descriptor.get_description: None until first use,
+# then the function, or False when the package is not installed. Avoids
+# paying the import-lock + sys.modules lookup on every call.
+_get_description: Any = None
+
+
+class CronExpression:
+    """Validated 5-field cron expression."""
+
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self._validate()
+
+    def _validate(self) -> None:
+        if not croniter.is_valid(self.expression):
+            raise ValueError(f"Invalid cron expression: {self.expression}")
+
+    def is_valid(self) -> bool:
+        return croniter.is_valid(self.expression)
+
+    def get_description(self) -> str:
+        """Human-readable form, when cron_descriptor is installed."""
+        global _get_description
+        if _get_description is None:
+            try:
+                from cron_descriptor import get_description as _get_description
+            except ImportError:
+                _get_description = False
+        if not _get_description:
+            return self.expression
+        try:
+            return _get_description(self.expression)
+        except Exception:
+            return self.expression
+
+
+class _CompiledCron:
+    """Cron fields expanded once into frozensets for O(1) is_due checks."""
+
+    __slots__ = (
+        "minutes", "hours", "days", "months", "dows",
+        "dom_restricted", "dow_restricted",
+    )
+
+    def __init__(self, expression: str) -> None:
+        expanded, nth_weekday = croniter.expand(expression)[:2]
+        if nth_weekday:
+            # '1#2'-style fields expand to a plain weekday plus this
+            # separate constraint map; the frozenset matcher would fire
+            # on every such weekday, so leave these to croniter.
+            raise ValueError(f"Unsupported nth-weekday field: {expression}")
+        minute_f, hour_f, dom_f, month_f, dow_f = expanded
+
+        def to_set(values: list, lo: int, hi: int) -> tuple:
+            if "*" in values:
+                return frozenset(range(lo, hi + 1)), False
+            if not all(isinstance(v, int) for v in values):
+                # 'l', nth-weekday etc.: leave those to croniter.
+                raise ValueError(f"Unsupported cron field: {values}")
+            return frozenset(values), True
+
+        self.minutes, _ = to_set(minute_f, 0, 59)
+        self.hours, _ = to_set(hour_f, 0, 23)
+        self.days, self.dom_restricted = to_set(dom_f, 1, 31)
+        self.months, _ = to_set(month_f, 1, 12)
+        # croniter day-of-week: 0-6 with Sunday == 0.
+        self.dows, self.dow_restricted = to_set(dow_f, 0, 6)
+
+    def matches(self, moment: datetime) -> bool:
+        if (
+            moment.minute not in self.minutes
+            or moment.hour not in self.hours
+            or moment.month not in self.months
+        ):
+            return False
+        dom_ok = moment.day in self.days
+        dow_ok = (moment.isoweekday() % 7) in self.dows
+        if self.dom_restricted and self.dow_restricted:
+            # POSIX cron: restricted dom and dow fields are OR'd.
+            return dom_ok or dow_ok
+        return dom_ok and dow_ok
+
+
+@lru_cache(maxsize=256)
+def _parse_cron(expression: str) -> Optional[_CompiledCron]:
+    """Compile a cron expression, memoized by string.
+
+    Parsing is pure and many schedules share the same expression
+    (e.g. the default hourly "0 * * * *"), so N configs with k
+    distinct expressions cost k parses. _CompiledCron instances are
+    immutable and safe to share. Returns None for expressions the
+    fast matcher cannot handle; callers then use croniter directly.
+    """
+    try:
+        return _CompiledCron(expression)
+    except ValueError:
+        return None
+
+
+@dataclass(slots=True)
+class ScheduleConfig:
+    """A named backup schedule bound to a database."""
+
+    name: str
+    cron_expression: str
+    database_id: str
+    enabled: bool = True
+    description: str = ""
+    _as_dict: Dict[str, Any] = field(init=False, repr=False)
+    _cron: Any = field(init=False, repr=False)
+    _compiled: Optional[_CompiledCron] = field(init=False, repr=False)
+    _next_run_cached: Optional[datetime] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # CronExpression validates in __init__; the old follow-up
+        # is_valid() call re-parsed the expression a second time.
+        CronExpression(self.cron_expression)
+        self._init_caches()
+
+    def _init_caches(self) -> None:
+        # Parse once; is_due/get_next_run re-base this croniter instead of
+        # re-tokenizing the expression on every polling tick.
+        self._cron = croniter(self.cron_expression)
+        self._compiled = _parse_cron(self.cron_expression)
+        self._next_run_cached = None
+        # Fields never mutate after construction (updates re-instantiate),
+        # so the serialized form is built exactly once.
+        self._as_dict = {
+            "name": self.name,
+            "cron_expression": self.cron_expression,
+            "database_id": self.database_id,
+            "enabled": self.enabled,
+            "description": self.description,
+        }
+
+    def get_next_run(self, base_time: Optional[datetime] = None) -> datetime:
+        base = base_time or datetime.now()
+        self._cron.set_current(base, force=True)
+        return self._cron.get_next(datetime)
+
+    def is_due(self, current_time: Optional[datetime] = None) -> bool:
+        now = current_time or datetime.now()
+        minute = now.replace(second=0, microsecond=0)
+        # Fast path: the previous call cached when this schedule fires
+        # next, so idle ticks before that moment cost one comparison.
+        cached = self._next_run_cached
+        if cached is not None:
+            if minute < cached:
+                return False
+            if minute == cached:
+                self._next_run_cached = self.get_next_run(minute)
+                return True
+            # Ticks were missed; fall through and recompute.
+        if self._compiled is not None:
+            # Direct field membership: a few frozenset checks instead of
+            # a croniter rewind-and-step per poll.
+            due = self._compiled.matches(minute)
+        else:
+            self._cron.set_current(minute - timedelta(minutes=1), force=True)
+            due = self._cron.get_next(datetime) == minute
+        self._next_run_cached = self.get_next_run(minute)
+        return due
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Copy-on-return so callers can't mutate the cached dict.
+        return dict(self._as_dict)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScheduleConfig":
+        return cls(
+            name=data["name"],
+            cron_expression=data["cron_expression"],
+            database_id=data["database_id"],
+            enabled=data.get("enabled", True),
+            description=data.get("description", ""),
+        )
+
+    @classmethod
+    def _trusted_create(
+        cls, name: str, cron_expression: str, database_id: str, **kwargs: Any
+    ) -> "ScheduleConfig":
+        """Construct without cron validation for expressions built from
+        locally range-checked integers. Untrusted input (dict-loaded
+        from disk, user-supplied strings) must go through ``__init__``."""
+        self = object.__new__(cls)
+        self.name = name
+        self.cron_expression = cron_expression
+        self.database_id = database_id
+        self.enabled = kwargs.get("enabled", True)
+        self.description = kwargs.get("description", "")
+        self._init_caches()
+        return self
+
+    @staticmethod
+    def _check_range(value: int, lo: int, hi: int, label: str) -> None:
+        if not lo <= value <= hi:
+            raise ValueError(f"{label} must be in {lo}..{hi}, got {value}")
+
+    @classmethod
+    def create_hourly(
+        cls, name: str, database_id: str, minute: int = 0, **kwargs: Any
+    ) -> "ScheduleConfig":
+        cls._check_range(minute, 0, 59, "minute")
+        return cls._trusted_create(
+            name, f"{minute} * * * *", database_id, **kwargs
+        )
+
+    @classmethod
+    def create_daily(
+        cls, name: str, database_id: str, hour: int = 2, minute: int = 0,
+        **kwargs: Any,
+    ) -> "ScheduleConfig":
+        cls._check_range(minute, 0, 59, "minute")
+        cls._check_range(hour, 0, 23, "hour")
+        return cls._trusted_create(
+            name, f"{minute} {hour} * * *", database_id, **kwargs
+        )
+
+    @classmethod
+    def create_weekly(
+        cls, name: str, database_id: str, day_of_week: int = 0, hour: int = 2,
+        minute: int = 0, **kwargs: Any,
+    ) -> "ScheduleConfig":
+        cls._check_range(minute, 0, 59, "minute")
+        cls._check_range(hour, 0, 23, "hour")
+        cls._check_range(day_of_week, 0, 6, "day_of_week")
+        return cls._trusted_create(
+            name, f"{minute} {hour} * * {day_of_week}", database_id, **kwargs
+        )
+
+    @classmethod
+    def create_monthly(
+        cls, name: str, database_id: str, day: int = 1, hour: int = 2,
+        minute: int = 0, **kwargs: Any,
+    ) -> "ScheduleConfig":
+        cls._check_range(minute, 0, 59, "minute")
+        cls._check_range(hour, 0, 23, "hour")
+        cls._check_range(day, 1, 31, "day")
+        return cls._trusted_create(
+            name, f"{minute} {hour} {day} * *", database_id, **kwargs
+        )
+
+
+@dataclass(slots=True)
+class ScheduleExecution:
+    """One run of a schedule, from trigger to completion."""
+
+    execution_id: str
+    schedule_name: str
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    status: str = "running"
+    backup_file: Optional[str] = None
+    backup_size: int = 0
+    error_message: Optional[str] = None
+    start_minute: int = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Schedules fire on minute boundaries, so sub-minute precision is
+        # noise; clamping gives a stable integer key whose comparison is
+        # one machine word instead of field-by-field datetime compares.
+        self.start_time = self.start_time.replace(second=0, microsecond=0)
+        self.start_minute = int(self.start_time.timestamp()) // 60
+
+    def complete(
+        self,
+        backup_file: Optional[str] = None,
+        backup_size: int = 0,
+        end_time: Optional[datetime] = None,
+    ) -> None:
+        self.status = "success"
+        self.end_time = end_time or datetime.now()
+        self.backup_file = backup_file
+        self.backup_size = backup_size
+
+    def fail(self, message: str, end_time: Optional[datetime] = None) -> None:
+        self.status = "failed"
+        self.end_time = end_time or datetime.now()
+        self.error_message = message
+
+    def get_duration(self) -> Optional[timedelta]:
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "execution_id": self.execution_id,
+            "schedule_name": self.schedule_name,
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "status": self.status,
+            "backup_file": self.backup_file,
+            "backup_size": self.backup_size,
+            "error_message": self.error_message,
+        }
+
+
+class ScheduleManager:
+    """Persists schedules under a config dir and tracks their executions."""
+
+    def __init__(self, config_dir: Path) -> None:
+        self.config_dir = Path(config_dir)
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        self._schedules: Dict[str, ScheduleConfig] = {}
+        # In-flight executions only; finished ones are persisted to
+        # SQLite (bounded memory) with a small recent-completions cache.
+        self._executions: Dict[str, ScheduleExecution] = {}
+        self._recent: deque = deque(maxlen=256)
+        # Latest execution per schedule, maintained at record time so the
+        # most frequent monitoring query never touches SQLite.
+        self._last_by_schedule: Dict[str, ScheduleExecution] = {}
+        self._exec_db = sqlite3.connect(
+            str(self.config_dir / "executions.db"), check_same_thread=False
+        )
+        self._exec_db.execute(
+            "CREATE TABLE IF NOT EXISTS executions("
+            "execution_id TEXT PRIMARY KEY, schedule_name TEXT,"
+            "start_time TEXT, end_time TEXT, status TEXT,"
+            "backup_file TEXT, backup_size INTEGER, error_message TEXT)"
+        )
+        self._exec_db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sched_time"
+            " ON executions(schedule_name, start_time DESC)"
+        )
+        self._exec_db.commit()
+        # Min-heap of (next_fire, name); _scheduled_at holds the single
+        # currently valid entry per name so stale heap entries (after
+        # update/delete) are lazily discarded on pop.
+        self._next_fire: List[tuple] = []
+        self._scheduled_at: Dict[str, datetime] = {}
+        # Write coalescing: single writes flush immediately, batch()
+        # defers the combined-file rewrite until exit.
+        self._dirty = False
+        self._batch_depth = 0
+        # Names of enabled schedules, maintained on add/update/delete so
+        # enabled-only listing is O(E) rather than a full filter pass.
+        self._enabled_names: set = set()
+        self._load_schedules()
+        now = datetime.now()
+        for schedule in self._schedules.values():
+            if schedule.enabled:
+                self._enabled_names.add(schedule.name)
+                self._push_next(schedule, now)
+
+    def _push_next(self, schedule: ScheduleConfig, base_time: datetime) -> None:
+        next_run = schedule.get_next_run(base_time)
+        self._scheduled_at[schedule.name] = next_run
+        heapq.heappush(self._next_fire, (next_run, schedule.name))
+
+    # All schedules live in one combined file: one open/parse at startup
+    # instead of a syscall + parser spin-up per schedule.
+    _COMBINED_FILE = "schedules.json"
+
+    def _load_schedules(self) -> None:
+        combined = self.config_dir / self._COMBINED_FILE
+        if combined.exists():
+            try:
+                data = _loads(combined.read_bytes())
+            except (OSError, ValueError) as exc:
+                logger.error("Could not load %s: %s", combined, exc)
+                return
+            for name, item in data.items():
+                try:
+                    self._schedules[name] = ScheduleConfig.from_dict(item)
+                    logger.info("Loaded schedule: %s", name)
+                except (ValueError, KeyError) as exc:
+                    logger.error("Could not load schedule %s: %s", name, exc)
+            return
+        # Legacy layout: one sidecar JSON per schedule. The GIL is
+        # released around file reads, so with many sidecars a small
+        # thread pool recovers disk parallelism on cold start.
+        paths = list(self.config_dir.glob("*.json"))
+        if len(paths) >= 16:
+            with ThreadPoolExecutor(max_workers=min(8, len(paths))) as executor:
+                loaded = executor.map(self._load_one, paths)
+        else:
+            loaded = map(self._load_one, paths)
+        for schedule in loaded:
+            if schedule is not None:
+                self._schedules[schedule.name] = schedule
+                logger.info("Loaded schedule: %s", schedule.name)
+
+    @staticmethod
+    def _load_one(path: Path) -> Optional[ScheduleConfig]:
+        try:
+            return ScheduleConfig.from_dict(_loads(path.read_bytes()))
+        except (OSError, ValueError, KeyError) as exc:
+            logger.error("Could not load schedule from %s: %s", path, exc)
+            return None
+
+    def _save_schedules(self) -> None:
+        self._dirty = True
+        if self._batch_depth == 0:
+            self.flush()
+
+    def _save_schedule(self, schedule: ScheduleConfig) -> None:
+        self._save_schedules()
+
+    def flush(self) -> None:
+        """Write pending schedule changes with write-to-tmp + atomic rename.
+
+        A crash mid-write leaves either the old file or the new one,
+        never a truncated mix; fsync before replace makes the rename
+        durable.
+        """
+        if not self._dirty:
+            return
+        path = self.config_dir / self._COMBINED_FILE
+        data = {name: s.to_dict() for name, s in self._schedules.items()}
+        with tempfile.NamedTemporaryFile(
+            dir=self.config_dir, delete=False
+        ) as tmp:
+            tmp.write(_dump_bytes(data))
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp.name, path)
+        self._dirty = False
+
+    @contextmanager
+    def batch(self) -> Iterator["ScheduleManager"]:
+        """Coalesce writes in bulk operations into a single flush.
+
+        ``with mgr.batch(): ...`` defers persistence until exit, so
+        importing N schedules costs one file write instead of N.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
+    def add_schedule(self, schedule: ScheduleConfig) -> None:
+        self._schedules[schedule.name] = schedule
+        self._save_schedule(schedule)
+        if schedule.enabled:
+            self._enabled_names.add(schedule.name)
+            self._push_next(schedule, datetime.now())
+        else:
+            self._enabled_names.discard(schedule.name)
+            self._scheduled_at.pop(schedule.name, None)
+        logger.info("Added schedule: %s", schedule.name)
+
+    def update_schedule(self, schedule: ScheduleConfig) -> None:
+        if schedule.name not in self._schedules:
+            raise KeyError(f"Unknown schedule: {schedule.name}")
+        self._schedules[schedule.name] = schedule
+        self._save_schedule(schedule)
+        if schedule.enabled:
+            self._enabled_names.add(schedule.name)
+            self._push_next(schedule, datetime.now())
+        else:
+            self._enabled_names.discard(schedule.name)
+            self._scheduled_at.pop(schedule.name, None)
+        logger.info("Updated schedule: %s", schedule.name)
+
+    def delete_schedule(self, name: str) -> None:
+        if self._schedules.pop(name, None) is None:
+            return
+        self._enabled_names.discard(name)
+        self._scheduled_at.pop(name, None)
+        self._save_schedules()
+        # Remove any legacy sidecar as well.
+        (self.config_dir / f"{name}.json").unlink(missing_ok=True)
+        logger.info("Deleted schedule: %s", name)
+
+    def get_schedule(self, name: str) -> Optional[ScheduleConfig]:
+        return self._schedules.get(name)
+
+    def list_schedules(self, enabled_only: bool = False) -> List[ScheduleConfig]:
+        if enabled_only:
+            return [self._schedules[name] for name in self._enabled_names]
+        return list(self._schedules.values())
+
+    def get_due_schedules(
+        self, current_time: Optional[datetime] = None
+    ) -> List[ScheduleConfig]:
+        """Pop due entries off the next-fire heap: O(log N) per tick.
+
+        Idle ticks cost one heap peek regardless of schedule count;
+        croniter runs only to reschedule entries that actually fired.
+        """
+        current_time = current_time or datetime.now()
+        due: List[ScheduleConfig] = []
+        while self._next_fire and self._next_fire[0][0] <= current_time:
+            fire_at, name = heapq.heappop(self._next_fire)
+            if self._scheduled_at.get(name) != fire_at:
+                continue  # superseded by update/delete
+            schedule = self._schedules.get(name)
+            if schedule is None or not schedule.enabled:
+                continue
+            due.append(schedule)
+            self._push_next(schedule, current_time)
+        return due
+
+    def _persist_execution(self, execution: ScheduleExecution) -> None:
+        self._exec_db.execute(
+            "INSERT OR REPLACE INTO executions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                execution.execution_id,
+                execution.schedule_name,
+                execution.start_time.isoformat(),
+                execution.end_time.isoformat() if execution.end_time else None,
+                execution.status,
+                execution.backup_file,
+                execution.backup_size,
+                execution.error_message,
+            ),
+        )
+        self._exec_db.commit()
+
+    @staticmethod
+    def _execution_from_row(row: tuple) -> ScheduleExecution:
+        return ScheduleExecution(
+            execution_id=row[0],
+            schedule_name=row[1],
+            start_time=datetime.fromisoformat(row[2]),
+            end_time=datetime.fromisoformat(row[3]) if row[3] else None,
+            status=row[4],
+            backup_file=row[5],
+            backup_size=row[6] or 0,
+            error_message=row[7],
+        )
+
+    def record_execution_start(
+        self, schedule_name: str, start_time: Optional[datetime] = None
+    ) -> str:
+        """Record a run start. Polling loops that already hold the tick
+        timestamp should pass it as ``start_time`` rather than paying
+        another clock read per due schedule."""
+        execution_id = uuid.uuid4().hex
+        execution = ScheduleExecution(
+            execution_id=execution_id,
+            schedule_name=schedule_name,
+            start_time=start_time or datetime.now(),
+        )
+        self._executions[execution_id] = execution
+        # complete()/fail() mutate this same object, so the cache entry
+        # stays current until a newer run of the schedule replaces it.
+        self._last_by_schedule[schedule_name] = execution
+        self._persist_execution(execution)
+        logger.info("Execution started: %s (%s)", schedule_name, execution_id)
+        return execution_id
+
+    def record_execution_complete(
+        self,
+        execution_id: str,
+        backup_file: Optional[str] = None,
+        backup_size: int = 0,
+    ) -> None:
+        execution = self._executions.pop(execution_id, None)
+        if execution is None:
+            return
+        execution.complete(backup_file, backup_size)
+        self._persist_execution(execution)
+        self._recent.append(execution)
+        logger.info("Execution complete: %s", execution.schedule_name)
+
+    def record_execution_fail(self, execution_id: str, message: str) -> None:
+        execution = self._executions.pop(execution_id, None)
+        if execution is None:
+            return
+        execution.fail(message)
+        self._persist_execution(execution)
+        self._recent.append(execution)
+        logger.info("Execution failed: %s: %s", execution.schedule_name, message)
+
+    def get_schedule_history(
+        self, schedule_name: Optional[str] = None, limit: int = 50
+    ) -> List[ScheduleExecution]:
+        if schedule_name is not None:
+            rows = self._exec_db.execute(
+                "SELECT * FROM executions WHERE schedule_name = ?"
+                " ORDER BY start_time DESC LIMIT ?",
+                (schedule_name, limit),
+            )
+        else:
+            rows = self._exec_db.execute(
+                "SELECT * FROM executions ORDER BY start_time DESC LIMIT ?",
+                (limit,),
+            )
+        return [self._execution_from_row(row) for row in rows]
+
+    def get_last_execution(self, schedule_name: str) -> Optional[ScheduleExecution]:
+        cached = self._last_by_schedule.get(schedule_name)
+        if cached is not None:
+            return cached
+        history = self.get_schedule_history(schedule_name, limit=1)
+        return history[0] if history else None
@@ -0,0 +1,255 @@
+"""Encrypted credential vault for database and storage secrets."""
+
+import json
+import logging
+import os
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timezone
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
+
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+logger = logging.getLogger(__name__)
+
+try:  # Rust-backed JSON: faster both ways and emits bytes directly,
+    # skipping the encode/decode steps around the cipher.
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:  # pragma: no cover
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode(
+            "utf-8"
+        )
+
+
+# Version byte prefixed to AES-GCM blobs; Fernet tokens decode to 0x80
+# as their first byte, so the two formats never collide and old vaults
+# keep decrypting during migration.
+_AESGCM_VERSION = b"\x02"
+_NONCE_LEN = 12
+
+# Compact the WAL back into the baseline blob once it grows past this
+# many delta records; keeps load cost bounded.
+_WAL_COMPACT_THRESHOLD = 64
+
+
+class EncryptionManager:
+    """Owns the vault key and the symmetric cipher built from it.
+
+    New blobs use AES-256-GCM: one AEAD call instead of Fernet's
+    AES-CBC + HMAC-SHA256 composition, which is 2-3x faster on AES-NI
+    hardware for the many small records a WAL vault produces. Fernet
+    remains for decrypting pre-migration blobs (and as the write path
+    when ``use_aesgcm=False``).
+    """
+
+    def __init__(self, key_path: Path, use_aesgcm: bool = True) -> None:
+        self.key_path = Path(key_path)
+        self._key = self._load_or_create_key()
+        # Build each cipher context exactly once; Fernet construction
+        # re-validates and splits the key every time, pure overhead
+        # when repeated per credential operation.
+        self._fernet = Fernet(self._key)
+        if use_aesgcm:
+            hkdf = HKDF(
+                algorithm=hashes.SHA256(),
+                length=32,
+                salt=None,
+                info=b"vya-backupdb vault aesgcm",
+            )
+            self._aesgcm: Optional[AESGCM] = AESGCM(hkdf.derive(self._key))
+        else:
+            self._aesgcm = None
+
+    def _load_or_create_key(self) -> bytes:
+        if self.key_path.exists():
+            return self.key_path.read_bytes()
+        key = Fernet.generate_key()
+        self.key_path.touch(mode=0o600)
+        self.key_path.write_bytes(key)
+        logger.info("Generated new vault key at %s", self.key_path)
+        return key
+
+    def get_fernet(self) -> Fernet:
+        """The shared Fernet context, for callers doing raw token work."""
+        return self._fernet
+
+    def _cipher(self) -> Fernet:
+        return self._fernet
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        if self._aesgcm is not None:
+            nonce = os.urandom(_NONCE_LEN)
+            blob = _AESGCM_VERSION + nonce + self._aesgcm.encrypt(nonce, data, None)
+            return urlsafe_b64encode(blob)
+        return self._cipher().encrypt(data)
+
+    def decrypt_bytes(self, token: bytes) -> bytes:
+        try:
+            raw = urlsafe_b64decode(token)
+        except ValueError as exc:  # binascii.Error included
+            # Malformed base64 means "cannot decrypt", the same way the
+            # Fernet path reports it - not a crash in the caller.
+            raise InvalidToken from exc
+        if raw[:1] == _AESGCM_VERSION:
+            if self._aesgcm is None:
+                raise InvalidToken
+            try:
+                return self._aesgcm.decrypt(
+                    raw[1 : 1 + _NONCE_LEN], raw[1 + _NONCE_LEN :], None
+                )
+            except ValueError as exc:  # truncated nonce/ciphertext
+                raise InvalidToken from exc
+        return self._cipher().decrypt(token)
+
+    def encrypt_string(self, text: str) -> str:
+        return self.encrypt_bytes(text.encode("utf-8")).decode("ascii")
+
+    def decrypt_string(self, token: str) -> str:
+        return self.decrypt_bytes(token.encode("ascii")).decode("utf-8")
+
+
+class VaultManager:
+    """Credential store encrypted at rest.
+
+    On-disk layout is one baseline encrypted blob plus a write-ahead
+    log of encrypted delta records:
+
+        {"baseline": <token>, "wal": [<token>, ...]}
+
+    ``load`` decrypts the baseline and every delta exactly once and
+    keeps plaintext credentials in ``_cache``, so ``get`` is a dict
+    lookup with no crypto work. ``set``/``remove`` encrypt only their
+    one delta record instead of rewriting the whole vault; the WAL is
+    folded back into the baseline by :meth:`compact` when it grows.
+    """
+
+    def __init__(
+        self,
+        vault_path: Path,
+        encryption_manager: Optional[EncryptionManager] = None,
+    ) -> None:
+        self.vault_path = Path(vault_path)
+        self._encryption = encryption_manager or EncryptionManager(
+            self.vault_path.with_suffix(".key")
+        )
+        self.vault_data: Dict[str, Any] = {"credentials": {}}
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._baseline: Optional[str] = None
+        self._wal: List[str] = []
+        if self.vault_path.exists():
+            self.load()
+
+    def load(self) -> None:
+        """Read and decrypt the vault once, populating the plaintext cache."""
+        try:
+            payload = _loads(self.vault_path.read_bytes())
+        except (OSError, ValueError) as exc:
+            logger.error("Could not read vault %s: %s", self.vault_path, exc)
+            return
+        self._baseline = payload.get("baseline")
+        self._wal = list(payload.get("wal", []))
+        credentials: Dict[str, Dict[str, Any]] = {}
+        try:
+            if self._baseline:
+                base = _loads(
+                    self._encryption.decrypt_bytes(self._baseline.encode("ascii"))
+                )
+                credentials.update(base.get("credentials", {}))
+            # Replay deltas in order; each is one small decrypt instead
+            # of re-decrypting the whole vault per record.
+            for blob in self._wal:
+                record = _loads(
+                    self._encryption.decrypt_bytes(blob.encode("ascii"))
+                )
+                if record["op"] == "set":
+                    credentials[record["credential_id"]] = record["credential"]
+                else:
+                    credentials.pop(record["credential_id"], None)
+        except (InvalidToken, InvalidTag):
+            logger.error("Vault %s cannot be decrypted with this key", self.vault_path)
+            return
+        self.vault_data = {"credentials": credentials}
+        # Share the credential dicts rather than copying: values are
+        # immutable strings and get() hands out read-only views.
+        self._cache = dict(credentials)
+
+    def _write_file(self) -> None:
+        payload = {"baseline": self._baseline, "wal": self._wal}
+        self.vault_path.touch(mode=0o600)
+        self.vault_path.write_bytes(_dumps(payload))
+
+    def save(self) -> None:
+        """Rewrite the baseline blob from current state and clear the WAL."""
+        plain = _dumps(self.vault_data)
+        self._baseline = self._encryption.encrypt_bytes(plain).decode("ascii")
+        self._wal = []
+        self._write_file()
+
+    def compact(self) -> None:
+        """Fold accumulated WAL records back into the baseline."""
+        self.save()
+
+    def _append_wal(self, record: Dict[str, Any]) -> None:
+        plain = _dumps(record)
+        self._wal.append(self._encryption.encrypt_bytes(plain).decode("ascii"))
+        if len(self._wal) > _WAL_COMPACT_THRESHOLD:
+            self.compact()
+        else:
+            self._write_file()
+
+    def set(
+        self,
+        credential_id: str,
+        username: str,
+        password: str,
+        **extra: Any,
+    ) -> None:
+        existing = self.vault_data["credentials"].get(credential_id)
+        now = datetime.now(timezone.utc).isoformat()
+        credential: Dict[str, Any] = {
+            "username": username,
+            "password": password,
+            "created_at": existing["created_at"] if existing else now,
+            "updated_at": now,
+            **extra,
+        }
+        self.vault_data["credentials"][credential_id] = credential
+        self._cache[credential_id] = credential
+        self._append_wal(
+            {"op": "set", "credential_id": credential_id, "credential": credential}
+        )
+        logger.info("Stored credential: %s", credential_id)
+
+    def get(self, credential_id: str) -> Optional[Mapping[str, Any]]:
+        """Plaintext credential lookup from the decrypt-once cache.
+
+        Returns a read-only view of the single shared dict: no copies
+        per hit, and callers cannot mutate vault state through it.
+        """
+        cached = self._cache.get(credential_id)
+        if cached is None:
+            return None
+        return MappingProxyType(cached)
+
+    def remove(self, credential_id: str) -> bool:
+        if credential_id not in self.vault_data["credentials"]:
+            return False
+        del self.vault_data["credentials"][credential_id]
+        self._cache.pop(credential_id, None)
+        self._append_wal({"op": "remove", "credential_id": credential_id})
+        logger.info("Removed credential: %s", credential_id)
+        return True
+
+    def list_credentials(self) -> List[str]:
+        return list(self.vault_data["credentials"])